@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from config import config
 from logger import logger
+from processor_cache import processor_cache
 import threading
 
 app = FastAPI(title="牛魔日报 控制API")
@@ -48,6 +49,21 @@ def update_interval(req: IntervalRequest):
         raise HTTPException(status_code=400, detail="推送间隔无效")
     return {"msg": f"推送间隔已更新为 {req.interval_minutes} 分钟"}
 
+@app.get("/cache")
+def get_cache_stats():
+    """获取处理器链缓存的命中统计"""
+    return {
+        "enabled": processor_cache.enabled,
+        "stats": processor_cache.stats()
+    }
+
+@app.post("/cache/clear")
+def clear_cache():
+    processor_cache.clear()
+    processor_cache.reset_stats()
+    logger.info("通过API清空了处理器链缓存")
+    return {"msg": "处理器链缓存已清空"}
+
 # 你可以继续扩展更多API，如关键词管理、后处理器管理等
 
 def run_api():
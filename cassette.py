@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from logger import logger
+
+
+class Cassette:
+    """
+    信息源 HTTP 请求的录制/回放
+
+    录制模式下将每个原始响应以 gzip 压缩、按内容 SHA-256 寻址的方式保存到目录中，
+    每一轮推送流程的请求单独建立索引；回放模式下从目录中读取某一轮的响应，信息源代码路径保持不变。
+
+    目录结构：
+        cycles/<轮次>/index.json  该轮的 请求键 -> 响应元数据（状态码、响应头、内容哈希等）
+        objects/ab/abcd....gz     响应内容，各轮共用，相同内容只保存一份
+    """
+
+    def __init__(self):
+        self.mode = None  # None / 'record' / 'replay'
+        self.directory = None
+        self.cycle = None  # 当前录制或回放的轮次
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, mode: Optional[str], directory: Optional[str] = None, cycle: Optional[str] = None):
+        """
+        设置录制/回放模式
+
+        Args:
+            mode: None 表示直接请求，'record' 表示录制，'replay' 表示回放
+            directory: 录制文件目录
+            cycle: 回放的轮次，为空时回放最近一轮
+        """
+        if mode not in (None, 'record', 'replay'):
+            raise ValueError(f"未知的录制模式: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.cycle = None
+        self._index = {}
+        if mode is None:
+            return
+
+        cycles = self.list_cycles()
+        if mode == 'replay':
+            if not cycles:
+                raise FileNotFoundError(f"录制目录中没有任何录制: {directory}")
+            if cycle is None:
+                cycle = cycles[-1]
+            elif cycle not in cycles:
+                raise FileNotFoundError(f"录制目录中没有轮次 {cycle}，可用的轮次: {', '.join(cycles)}")
+            with open(self._index_path(cycle), 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+            self.cycle = cycle
+            logger.info(f"HTTP 回放模式，目录: {directory}，轮次: {cycle}，共 {len(self._index)} 条记录")
+        else:
+            logger.info(f"HTTP 录制模式，目录: {directory}，已有 {len(cycles)} 轮录制")
+
+    def list_cycles(self) -> List[str]:
+        """按时间顺序列出录制目录中的所有轮次"""
+        cycles_dir = os.path.join(self.directory, 'cycles')
+        if not os.path.isdir(cycles_dir):
+            return []
+        return sorted(name for name in os.listdir(cycles_dir) if os.path.exists(self._index_path(name)))
+
+    def start_cycle(self):
+        """录制模式下开始新的一轮录制，之后的请求记录到新的索引中"""
+        if self.mode != 'record':
+            return
+        with self._lock:
+            cycle = datetime.now().strftime('%Y%m%d_%H%M%S')
+            suffix = 1
+            while os.path.exists(os.path.join(self.directory, 'cycles', cycle)):
+                suffix += 1
+                cycle = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{suffix}"
+            os.makedirs(os.path.join(self.directory, 'cycles', cycle))
+            self.cycle = cycle
+            self._index = {}
+        logger.info(f"开始录制轮次 {cycle}")
+
+    def _index_path(self, cycle: str) -> str:
+        return os.path.join(self.directory, 'cycles', cycle, 'index.json')
+
+    @staticmethod
+    def _request_key(method: str, url: str, params: Any) -> str:
+        raw = json.dumps([method.upper(), url, params], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.gz")
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        发送（或录制/回放）一个 HTTP 请求，参数与 requests.request 相同
+
+        Returns:
+            requests.Response: 响应对象
+        """
+        if self.mode is None:
+            return requests.request(method, url, **kwargs)
+
+        key = self._request_key(method, url, kwargs.get('params'))
+        if self.mode == 'replay':
+            return self._replay(key, method, url)
+
+        if self.cycle is None:
+            self.start_cycle()
+        start = time.time()
+        response = requests.request(method, url, **kwargs)
+        self._record(key, method, url, response, time.time() - start)
+        return response
+
+    def _record(self, key: str, method: str, url: str, response: requests.Response, elapsed: float):
+        """保存响应内容和元数据"""
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with gzip.open(path, 'wb') as f:
+                    f.write(body)
+            self._index[key] = {
+                'method': method.upper(),
+                'url': url,
+                'final_url': response.url,
+                'status': response.status_code,
+                'headers': dict(response.headers),
+                'encoding': response.encoding,
+                'body': digest,
+                'elapsed': elapsed,
+                'recorded_at': time.time(),
+            }
+            index_file = self._index_path(self.cycle)
+            tmp_file = f"{index_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, index_file)
+        logger.debug(f"已录制 {method.upper()} {url} -> {digest[:12]}")
+
+    def _replay(self, key: str, method: str, url: str) -> requests.Response:
+        """从目录中构造响应"""
+        entry = self._index.get(key)
+        if entry is None:
+            raise requests.ConnectionError(f"回放轮次 {self.cycle} 中没有该请求的录制: {method.upper()} {url}")
+        with gzip.open(self._object_path(entry['body']), 'rb') as f:
+            body = f.read()
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response.url = entry['final_url']
+        response.reason = 'Replayed'
+        response._content = body
+        logger.debug(f"已回放 {method.upper()} {url} <- {entry['body'][:12]}")
+        return response
+
+
+# 创建全局录制/回放实例
+cassette = Cassette()
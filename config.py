@@ -15,6 +15,15 @@ class Config:
         "schedule": {
             "interval_minutes": 1440,  # 默认每天
             "timezone": "Asia/Shanghai"
+        },
+        "coordination": {
+            "enabled": False,  # 多实例协调，默认关闭
+            "backend": "sqlite",
+            "path": "data/coordination.db"
+        },
+        "cache": {
+            "enabled": True,  # 处理器链缓存
+            "max_entries": 256
         }
     }
     
@@ -68,6 +77,14 @@ class Config:
         """获取调度配置"""
         return self._config.get('schedule', {})
     
+    def get_coordination(self) -> Dict[str, Any]:
+        """获取多实例协调配置"""
+        return self._config.get('coordination', {})
+    
+    def get_cache(self) -> Dict[str, Any]:
+        """获取处理器链缓存配置"""
+        return self._config.get('cache', {})
+    
     def update_source_status(self, source_name: str, enabled: bool) -> bool:
         """更新信息源启用状态"""
         for source in self._config.get('sources', []):
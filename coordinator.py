@@ -0,0 +1,335 @@
+import bisect
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from logger import logger
+
+
+class BaseCoordinationBackend(ABC):
+    """多实例协调存储后端基类，网络存储（如 Redis、etcd）可实现同样的接口"""
+
+    @abstractmethod
+    def heartbeat(self, node_id: str):
+        """上报节点心跳"""
+        pass
+
+    @abstractmethod
+    def remove_node(self, node_id: str):
+        """注销节点"""
+        pass
+
+    @abstractmethod
+    def live_nodes(self, ttl: float) -> List[str]:
+        """获取 ttl 秒内有心跳的节点列表"""
+        pass
+
+    @abstractmethod
+    def try_acquire_lease(self, slot: str, node_id: str, ttl: float) -> bool:
+        """尝试获取某个推送时间点的租约，已持有或租约过期后被抢到时返回 True"""
+        pass
+
+    @abstractmethod
+    def renew_lease(self, slot: str, node_id: str, ttl: float) -> bool:
+        """续期本节点持有的租约，租约已被他人接管或已完成推送时返回 False"""
+        pass
+
+    @abstractmethod
+    def mark_sent(self, slot: str, node_id: str):
+        """标记某个推送时间点已完成推送"""
+        pass
+
+    @abstractmethod
+    def is_sent(self, slot: str) -> bool:
+        """某个推送时间点是否已完成推送"""
+        pass
+
+    @abstractmethod
+    def publish_results(self, slot: str, node_id: str, payload: Dict[str, Any]):
+        """发布本节点的数据（可 JSON 序列化的字典）"""
+        pass
+
+    @abstractmethod
+    def collect_results(self, slot: str) -> Dict[str, Dict[str, Any]]:
+        """收集所有节点发布的数据，返回 节点 -> 数据"""
+        pass
+
+
+class SqliteCoordinationBackend(BaseCoordinationBackend):
+    """基于 SQLite 文件的协调后端，数据库文件放在各实例共享的存储上"""
+
+    def __init__(self, path: str, busy_timeout: float = 10.0, retention_seconds: float = 86400):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.retention_seconds = retention_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, last_seen REAL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases "
+                "(slot TEXT PRIMARY KEY, node_id TEXT, expires_at REAL, sent INTEGER DEFAULT 0, created REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(slot TEXT, node_id TEXT, data TEXT, created REAL, PRIMARY KEY (slot, node_id))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用独立连接，便于在心跳线程和主线程中同时使用
+        return sqlite3.connect(self.path, timeout=self.busy_timeout)
+
+    def heartbeat(self, node_id: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO nodes (node_id, last_seen) VALUES (?, ?)", (node_id, time.time()))
+
+    def remove_node(self, node_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+
+    def live_nodes(self, ttl: float) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT node_id FROM nodes WHERE last_seen >= ? ORDER BY node_id", (time.time() - ttl,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def try_acquire_lease(self, slot: str, node_id: str, ttl: float) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT node_id, expires_at, sent FROM leases WHERE slot = ?", (slot,)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO leases (slot, node_id, expires_at, created) VALUES (?, ?, ?, ?)",
+                    (slot, node_id, now + ttl, now)
+                )
+                # 顺便清理过期的历史记录
+                deadline = now - self.retention_seconds
+                conn.execute("DELETE FROM leases WHERE created < ?", (deadline,))
+                conn.execute("DELETE FROM results WHERE created < ?", (deadline,))
+                acquired = True
+            elif row[0] == node_id:
+                acquired = True
+            elif not row[2] and row[1] < now:
+                conn.execute("UPDATE leases SET node_id = ?, expires_at = ? WHERE slot = ?", (node_id, now + ttl, slot))
+                logger.warning(f"节点 {row[0]} 的租约 {slot} 已过期，由 {node_id} 接管")
+                acquired = True
+            else:
+                acquired = False
+            conn.execute("COMMIT")
+            return acquired
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew_lease(self, slot: str, node_id: str, ttl: float) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE slot = ? AND node_id = ? AND sent = 0",
+                (time.time() + ttl, slot, node_id)
+            )
+        return cursor.rowcount > 0
+
+    def mark_sent(self, slot: str, node_id: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE leases SET sent = 1 WHERE slot = ? AND node_id = ?", (slot, node_id))
+
+    def is_sent(self, slot: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT sent FROM leases WHERE slot = ?", (slot,)).fetchone()
+        return bool(row and row[0])
+
+    def publish_results(self, slot: str, node_id: str, payload: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (slot, node_id, data, created) VALUES (?, ?, ?, ?)",
+                (slot, node_id, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+
+    def collect_results(self, slot: str) -> Dict[str, Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT node_id, data FROM results WHERE slot = ?", (slot,)).fetchall()
+        return {node_id: json.loads(data) for node_id, data in rows}
+
+
+# 可用的协调后端，新增后端时在此注册
+BACKENDS = {
+    'sqlite': SqliteCoordinationBackend,
+}
+
+
+class HashRing:
+    """一致性哈希环，节点增减时只有少量信息源需要迁移"""
+
+    def __init__(self, nodes: List[str], replicas: int = 64):
+        self._ring = sorted(
+            (self._hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def get_node(self, key: str) -> Optional[str]:
+        """获取负责某个键的节点"""
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class Coordinator:
+    """多实例协调器：维护心跳、按一致性哈希分配信息源、通过租约选出每次推送的发送者"""
+
+    def __init__(self, settings: Dict[str, Any]):
+        backend_name = settings.get('backend', 'sqlite')
+        if backend_name not in BACKENDS:
+            raise ValueError(f"未知的协调后端: {backend_name}")
+        self.backend = BACKENDS[backend_name](settings.get('path', os.path.join('data', 'coordination.db')))
+        self.node_id = settings.get('node_id') or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = settings.get('heartbeat_interval_seconds', 10)
+        self.node_ttl = settings.get('node_ttl_seconds', 30)
+        self.lease_ttl = settings.get('lease_ttl_seconds', 120)
+        self.collect_timeout = settings.get('collect_timeout_seconds', 60)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """注册节点并启动后台心跳线程"""
+        self.backend.heartbeat(self.node_id)
+        self._thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._thread.start()
+        logger.info(f"多实例协调已启用，本节点: {self.node_id}")
+
+    def stop(self):
+        """停止心跳并注销节点"""
+        self._stop_event.set()
+        try:
+            self.backend.remove_node(self.node_id)
+        except Exception as e:
+            logger.error(f"注销节点 {self.node_id} 失败: {e}")
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_interval):
+            try:
+                self.backend.heartbeat(self.node_id)
+            except Exception as e:
+                logger.error(f"上报心跳失败: {e}")
+
+    def live_nodes(self) -> List[str]:
+        """获取当前存活的节点（总是包含本节点）"""
+        nodes = set(self.backend.live_nodes(self.node_ttl))
+        nodes.add(self.node_id)
+        return sorted(nodes)
+
+    def assign_sources(self, source_names: List[str], nodes: List[str], node_id: Optional[str] = None) -> List[str]:
+        """返回分配给某个节点（默认为本节点）的信息源"""
+        ring = HashRing(nodes)
+        node_id = node_id or self.node_id
+        return [name for name in source_names if ring.get_node(name) == node_id]
+
+    def publish(self, slot: str, results: Dict[str, List[Dict[str, Any]]], fetched_at: Dict[str, float]):
+        """
+        发布本节点获取到的数据
+
+        Args:
+            slot: 推送时间点
+            results: 信息源 -> 数据
+            fetched_at: 本节点尝试获取过的信息源 -> 开始获取的时间戳，包括没有数据或获取失败的信息源
+        """
+        self.backend.publish_results(slot, self.node_id, {'results': results, 'fetched_at': fetched_at})
+
+    def try_lead(self, slot: str) -> bool:
+        """尝试成为本次推送的发送者"""
+        return self.backend.try_acquire_lease(slot, self.node_id, self.lease_ttl)
+
+    @contextmanager
+    def hold_lease(self, slot: str):
+        """在 with 块执行期间，由后台线程定期续期本节点持有的租约"""
+        stop_event = threading.Event()
+
+        def renew_loop():
+            while not stop_event.wait(self.lease_ttl / 3):
+                try:
+                    if not self.backend.renew_lease(slot, self.node_id, self.lease_ttl):
+                        logger.warning(f"续期推送 {slot} 的租约失败，租约可能已被其他节点接管")
+                        return
+                except Exception as e:
+                    logger.error(f"续期推送 {slot} 的租约出错: {e}")
+
+        thread = threading.Thread(target=renew_loop, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            thread.join()
+
+    def collect(self, slot: str, nodes: List[str]) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, float], List[str]]:
+        """
+        等待所有节点发布数据，已经失去心跳的节点不再等待
+
+        Returns:
+            Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, float], List[str]]:
+                合并后的 信息源 -> 数据、被尝试获取过的 信息源 -> 开始获取的时间戳，以及没有发布数据的节点
+        """
+        deadline = time.time() + self.collect_timeout
+        while True:
+            published = self.backend.collect_results(slot)
+            missing = [node for node in nodes if node not in published]
+            if not missing:
+                break
+            live = set(self.live_nodes())
+            if not any(node in live for node in missing):
+                logger.warning(f"节点 {', '.join(missing)} 已失去心跳，不再等待其数据")
+                break
+            if time.time() >= deadline:
+                logger.warning(f"等待节点数据超时，缺少: {', '.join(missing)}")
+                break
+            time.sleep(1)
+
+        merged, fetched_at = {}, {}
+        for payload in published.values():
+            merged.update(payload.get('results', {}))
+            fetched_at.update(payload.get('fetched_at', {}))
+        return merged, fetched_at, missing
+
+    def mark_sent(self, slot: str):
+        """标记本次推送已完成"""
+        self.backend.mark_sent(slot, self.node_id)
+
+    def wait_for_send(self, slot: str, extra_seconds: float = 0.0) -> bool:
+        """
+        等待发送者完成推送
+
+        Args:
+            slot: 推送时间点
+            extra_seconds: 发送者预计额外等待的时间（如提前获取后等待对齐时间点），计入等待超时
+
+        Returns:
+            bool: 推送已完成返回 True；发送者租约过期、需要本节点接管时返回 False
+        """
+        deadline = time.time() + extra_seconds + self.collect_timeout + self.lease_ttl
+        while time.time() < deadline:
+            if self.backend.is_sent(slot):
+                return True
+            if self.try_lead(slot):
+                return False
+            time.sleep(1)
+        logger.warning(f"等待推送 {slot} 完成超时")
+        return True
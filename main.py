@@ -1,15 +1,20 @@
 import time
 import signal
 import sys
+import os
+import json
+import tempfile
 import importlib
 from datetime import datetime
 import threading
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import pytz
 import argparse
 
 from logger import logger
 from config import config
+from cassette import cassette
+from processor_cache import processor_cache
 from processors.base import BaseProcessor
 from webhook import Webhook
 
@@ -25,6 +30,12 @@ class OxDemonService:
         self.sources = {}  # 动态加载的信息源模块
         self.processors = {}  # 动态加载的后处理器模块
         self.webhook = Webhook(config.get_webhook_url())
+        self.coordinator = None  # 多实例协调器，仅在 run() 中启用
+        self.timings = {'sources': {}, 'processors': {}}  # 最近一次获取/处理的耗时（秒）
+        self.latency_estimates = {'sources': {}, 'processing': None}  # 耗时的滑动平均估计（秒）
+        self.fetched_at = {}  # 各信息源最近一次开始获取的时间戳
+        self.last_slot = None  # 最近一次执行推送的对齐时间点
+        processor_cache.configure(config.get_cache())
         self._load_modules()
         
         # 注册信号处理
@@ -35,6 +46,8 @@ class OxDemonService:
         """处理终止信号"""
         logger.info(f"收到信号 {signum}，准备停止服务...")
         self.running = False
+        if self.coordinator:
+            self.coordinator.stop()
         sys.exit(0)
     
     def _load_modules(self):
@@ -80,35 +93,74 @@ class OxDemonService:
         # 重新加载模块
         self._load_modules()
     
-    def _fetch_data(self) -> List[Dict[str, Any]]:
-        """从所有启用的信息源获取数据"""
-        all_data = []
+    def _fetch_by_source(self, source_names: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """从启用的信息源获取数据，按信息源分组返回；source_names 为空时获取所有信息源"""
+        results = {}
+        self.timings['sources'] = {}
         for source_config in config.get_sources():
             source_name = source_config['name']
+            if source_names is not None and source_name not in source_names:
+                continue
             if source_name in self.sources:
+                self.fetched_at[source_name] = time.time()
+                start = time.perf_counter()
                 try:
                     source_data = self.sources[source_name].fetch_data(**source_config['params'])
                     if source_data:
-                        all_data.extend(source_data)
-                        logger.info(f"从 {source_name} 获取到 {len(source_data)} 条数据")
+                        results[source_name] = source_data
+                        logger.info(f"从 {source_name} 获取到 {len(source_data)} 条数据，耗时 {time.perf_counter() - start:.3f} 秒")
                 except Exception as e:
                     logger.error(f"从 {source_name} 获取数据失败: {e}")
+                self.timings['sources'][source_name] = time.perf_counter() - start
+        return results
+    
+    def _fetch_data(self) -> List[Dict[str, Any]]:
+        """从所有启用的信息源获取数据"""
+        all_data = []
+        for source_data in self._fetch_by_source().values():
+            all_data.extend(source_data)
         return all_data
     
-    def _process_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """使用所有启用的后处理器处理数据"""
+    def _process_data(self, data: List[Dict[str, Any]], state_dir: Optional[str] = None,
+                      use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        使用所有启用的后处理器处理数据
+        
+        Args:
+            data: 要处理的数据
+            state_dir: 不为空时，处理器的持久化状态文件改为放在该目录下（用于回放）
+            use_cache: 是否使用处理器链缓存
+        """
         processed_data = data
+        self.timings['processors'] = {}
         for processor_config in config.get_processors():
             processor_name = processor_config['name']
             if processor_name in self.processors:
+                start = time.perf_counter()
+                processor = self.processors[processor_name]
+                params = processor_config['params']
+                if state_dir:
+                    params = dict(params)
+                    for param, default in processor.state_params.items():
+                        if params.get(param, default):
+                            params[param] = os.path.join(state_dir, f"{processor_name}_{param}.json")
                 try:
-                    processed_data = self.processors[processor_name].process(
-                        processed_data,
-                        **processor_config['params']
-                    )
-                    logger.info(f"使用 {processor_name} 处理数据，剩余 {len(processed_data)} 条")
+                    if use_cache and processor_cache.enabled and processor.is_cacheable(**params):
+                        processed_data = processor_cache.run(processor_name, processor, processed_data, params)
+                    else:
+                        processed_data = processor.process(processed_data, **params)
+                    logger.info(f"使用 {processor_name} 处理数据，剩余 {len(processed_data)} 条，耗时 {time.perf_counter() - start:.3f} 秒")
                 except Exception as e:
                     logger.error(f"使用 {processor_name} 处理数据失败: {e}")
+                self.timings['processors'][processor_name] = time.perf_counter() - start
+        
+        if use_cache and processor_cache.enabled:
+            stats = processor_cache.stats()
+            logger.info(
+                f"处理器链缓存: 阶段命中率 {stats['stage_hit_rate']:.1%} "
+                f"({stats['stage_hits']}/{stats['stage_hits'] + stats['stage_misses']})，"
+                f"单条命中率 {stats['item_hit_rate']:.1%} ({stats['item_hits']}/{stats['item_hits'] + stats['item_misses']})"
+            )
         return processed_data
     
     def _send_data(self, data: List[Dict[str, Any]]):
@@ -138,21 +190,134 @@ class OxDemonService:
         except Exception as e:
             logger.error(f"发送数据失败: {e}")
     
+    def _update_latency_estimates(self):
+        """用最近一次的耗时更新各信息源获取耗时和处理耗时的指数滑动平均，已计入的耗时会被清空，避免重复计入"""
+        alpha = config.get_schedule().get('prefetch', {}).get('smoothing', 0.3)
+        
+        def smooth(old, new):
+            return new if old is None else alpha * new + (1 - alpha) * old
+        
+        for source_name, elapsed in self.timings['sources'].items():
+            estimates = self.latency_estimates['sources']
+            estimates[source_name] = smooth(estimates.get(source_name), elapsed)
+        if self.timings['processors']:
+            self.latency_estimates['processing'] = smooth(
+                self.latency_estimates['processing'], sum(self.timings['processors'].values())
+            )
+        self.timings = {'sources': {}, 'processors': {}}
+    
+    def _estimated_pipeline_seconds(self) -> float:
+        """估计获取所有信息源并处理数据的总耗时（含安全余量）"""
+        prefetch = config.get_schedule().get('prefetch', {})
+        default_latency = prefetch.get('default_latency_seconds', 10)
+        # 信息源是依次获取的，总耗时为各信息源耗时之和
+        seconds = sum(
+            self.latency_estimates['sources'].get(s['name'], default_latency) for s in config.get_sources()
+        )
+        seconds += self.latency_estimates['processing'] or 0.0
+        return seconds + prefetch.get('margin_seconds', 5)
+    
+    def _prefetch_lead_seconds(self) -> float:
+        """
+        估计需要提前多少秒开始获取和处理数据，才能在对齐时间点准时推送
+        
+        提前量不超过新鲜度上限，因此推送时数据的年龄不会超过该上限，不需要在发送前重新获取；
+        估计耗时超过新鲜度上限时只提前新鲜度上限这么多，推送会晚于对齐时间点（晚估计耗时与上限之差）。
+        """
+        prefetch = config.get_schedule().get('prefetch', {})
+        if not prefetch.get('enabled', False):
+            return 0.0
+        freshness = prefetch.get('freshness_seconds', 300)
+        estimate = self._estimated_pipeline_seconds()
+        if estimate > freshness:
+            logger.warning(f"预计获取和处理耗时 {estimate:.1f} 秒，超过新鲜度上限 {freshness} 秒，推送将晚于对齐时间点")
+        max_lead = min(prefetch.get('max_lead_seconds', 600), freshness, config.get_schedule()['interval_minutes'] * 60 / 2)
+        return min(estimate, max_lead)
+    
+    def _wait_until(self, target: datetime):
+        """等待到指定的时间点（带时区），直到墙上时钟确实越过该时间点"""
+        tz = pytz.timezone(config.get_schedule()['timezone'])
+        # time.sleep 按单调时钟计时，墙上时钟被 NTP 调慢时醒来可能还没到目标时间，需要再等
+        while True:
+            wait_seconds = (target - datetime.now(tz)).total_seconds()
+            if wait_seconds <= 0:
+                break
+            time.sleep(wait_seconds)
+    
+    def _run_prefetched(self, send_at: datetime):
+        """提前获取并处理数据，到对齐时间点再发送（提前量不超过新鲜度上限，见 _prefetch_lead_seconds）"""
+        processed_data = self._process_data(self._fetch_data())
+        self._update_latency_estimates()
+        
+        self._wait_until(send_at)
+        self._send_data(processed_data)
+    
+    def _run_coordinated(self, slot: str, send_at: Optional[datetime] = None):
+        """多实例模式下执行一次推送：只获取分配给本节点的信息源，由租约持有者合并数据并发送"""
+        nodes = self.coordinator.live_nodes()
+        source_names = [s['name'] for s in config.get_sources()]
+        assigned = self.coordinator.assign_sources(source_names, nodes)
+        logger.info(f"当前存活节点 {len(nodes)} 个，本节点负责信息源: {assigned}")
+        results = self._fetch_by_source(assigned)
+        # 没有数据或获取失败的信息源也一并发布，发送者据此判断哪些信息源没有节点尝试过
+        self.coordinator.publish(slot, results, {
+            name: self.fetched_at[name] for name in assigned if name in self.fetched_at
+        })
+        self._update_latency_estimates()
+        
+        # 发送者会等到对齐时间点才发送，跟随者的等待时间需要加上这段时间
+        send_delay = max(send_at.timestamp() - time.time(), 0.0) if send_at is not None else 0.0
+        if not self.coordinator.try_lead(slot) and self.coordinator.wait_for_send(slot, send_delay):
+            logger.info(f"推送 {slot} 由其他节点发送")
+            return
+        
+        logger.info(f"本节点持有推送 {slot} 的租约，合并各节点数据")
+        with self.coordinator.hold_lease(slot):
+            results, fetched_at, missing = self.coordinator.collect(slot, nodes)
+            # 按信息源核对：节点宕机，或成员变化时各节点看到的哈希环不同，都可能使某些信息源没有任何节点获取
+            orphaned = [name for name in source_names if name not in fetched_at and name in self.sources]
+            if orphaned:
+                reason = f"（未发布数据的节点: {', '.join(missing)}）" if missing else ''
+                logger.warning(f"信息源 {orphaned} 没有节点获取{reason}，由本节点补取")
+                results.update(self._fetch_by_source(orphaned))
+            
+            data = []
+            for source_name in source_names:
+                data.extend(results.get(source_name, []))
+            processed_data = self._process_data(data)
+            self._update_latency_estimates()
+            if send_at is not None:
+                self._wait_until(send_at)
+            self._send_data(processed_data)
+            self.coordinator.mark_sent(slot)
+    
     def run(self):
         """运行服务"""
         logger.info("牛魔日报服务启动...")
         start_api_server()  # 启动API服务
         
+        if config.get_coordination().get('enabled', False):
+            from coordinator import Coordinator
+            self.coordinator = Coordinator(config.get_coordination())
+            self.coordinator.start()
+        
         while self.running:
             try:
                 # 获取下次运行时间（已经是带时区的时间）
                 next_run = config.get_next_run_time()
+                if self.last_slot is not None and next_run <= self.last_slot:
+                    # 刚推送完时墙上时钟可能还略早于该时间点，会再次得到同一个时间点，等时钟越过后重新计算
+                    self._wait_until(self.last_slot)
+                    continue
                 # 获取当前时区的时间
                 tz = pytz.timezone(config.get_schedule()['timezone'])
                 now = datetime.now(tz)
                 
-                # 计算等待时间
-                wait_seconds = (next_run - now).total_seconds()
+                # 计算等待时间，开启预取时提前开始
+                lead_seconds = self._prefetch_lead_seconds()
+                wait_seconds = (next_run - now).total_seconds() - lead_seconds
+                if lead_seconds:
+                    logger.info(f"预取已开启，将提前 {lead_seconds:.1f} 秒开始获取数据")
                 if wait_seconds > 0:
                     logger.info(f"等待 {wait_seconds:.1f} 秒后执行下一次推送")
                     time.sleep(wait_seconds)
@@ -168,9 +333,16 @@ class OxDemonService:
                 
                 # 执行推送流程
                 logger.info("开始执行推送流程...")
-                data = self._fetch_data()
-                processed_data = self._process_data(data)
-                self._send_data(processed_data)
+                self.last_slot = next_run
+                cassette.start_cycle()
+                if self.coordinator:
+                    self._run_coordinated(next_run.isoformat(), next_run if lead_seconds else None)
+                elif lead_seconds:
+                    self._run_prefetched(next_run)
+                else:
+                    data = self._fetch_data()
+                    processed_data = self._process_data(data)
+                    self._send_data(processed_data)
                 
             except Exception as e:
                 logger.error(f"服务运行出错: {e}")
@@ -181,18 +353,59 @@ class OxDemonService:
     def test_instant_run(self):
         """立即推送一次并结束服务"""
         logger.info("牛魔日报立即推送测试开始...")
+        cassette.start_cycle()
         data = self._fetch_data()
         processed_data = self._process_data(data)
         self._send_data(processed_data)
         logger.info("牛魔日报立即推送测试结束，服务退出。")
 
+    def replay_run(self, replay_dir: str):
+        """
+        使用录制的某一轮响应离线执行一次完整流程，不推送，将处理结果和耗时写入录制目录
+        
+        处理器的持久化状态（语料统计、去重签名等）放在每次回放新建的临时目录中，
+        从空状态开始且不影响线上状态，因此同一份录制多次回放的结果是可重复的。
+        """
+        logger.info(f"牛魔日报回放开始，录制目录: {replay_dir}，轮次: {cassette.cycle}")
+        with tempfile.TemporaryDirectory(prefix='ox_demon_replay_') as state_dir:
+            start = time.perf_counter()
+            data = self._fetch_data()
+            # 回放用于比较不同版本处理器的输出和耗时，不使用处理器链缓存
+            processed_data = self._process_data(data, state_dir=state_dir, use_cache=False)
+            total = time.perf_counter() - start
+        
+        output_dir = os.path.join(replay_dir, 'runs')
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'cycle': cassette.cycle,
+                'fetched': len(data),
+                'output': processed_data,
+                'timings': dict(self.timings, total=total),
+            }, f, ensure_ascii=False, indent=2, default=str)
+        logger.info(f"牛魔日报回放结束，共 {len(processed_data)} 条，耗时 {total:.3f} 秒，结果已写入: {output_file}")
+
 def main():
     parser = argparse.ArgumentParser(description="牛魔日报服务入口")
     parser.add_argument('--test', '--instant', action='store_true', help='立即推送一次并退出')
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument('--record', metavar='DIR', help='录制信息源的所有 HTTP 响应到指定目录')
+    mode_group.add_argument('--replay', metavar='DIR', help='从录制目录回放 HTTP 响应，离线执行一次流程（不推送）并退出')
+    parser.add_argument('--cycle', metavar='ID', help='与 --replay 一起使用，指定回放的录制轮次（默认为最近一轮）')
     args = parser.parse_args()
+    if args.cycle and not args.replay:
+        parser.error('--cycle 只能与 --replay 一起使用')
+
+    if args.record:
+        cassette.configure('record', args.record)
+    elif args.replay:
+        cassette.configure('replay', args.replay, args.cycle)
 
     service = OxDemonService()
-    if args.test:
+    if args.replay:
+        service.replay_run(args.replay)
+    elif args.test:
         service.test_instant_run()
     else:
         service.run()
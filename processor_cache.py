@@ -0,0 +1,239 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from logger import logger
+from processors.base import BaseProcessor
+
+
+def _digest(obj: Any) -> str:
+    """对可 JSON 序列化的对象计算稳定的哈希值"""
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+_code_versions: Dict[type, str] = {}
+
+
+def _code_version(processor: BaseProcessor) -> str:
+    """
+    处理器的代码版本：version 属性加上相关模块源码的哈希，处理器代码变化后旧缓存（包括磁盘缓存）自动失效
+
+    相关模块包括类继承链上的模块，以及处理器模块从同一个包中导入的函数和类所在的模块（如 processors.text）
+    """
+    cls = type(processor)
+    version = _code_versions.get(cls)
+    if version is None:
+        module_names = {klass.__module__ for klass in cls.__mro__}
+        package = cls.__module__.split('.')[0]
+        for value in vars(sys.modules[cls.__module__]).values():
+            name = getattr(value, '__module__', None)
+            if isinstance(name, str) and name.split('.')[0] == package:
+                module_names.add(name)
+
+        sha = hashlib.sha256(str(processor.version).encode('utf-8'))
+        for name in sorted(module_names):
+            path = getattr(sys.modules.get(name), '__file__', None)
+            if path and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    sha.update(f.read())
+        version = sha.hexdigest()
+        _code_versions[cls] = version
+    return version
+
+
+class _LRU:
+    """容量有限的 LRU 缓存"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ProcessorCache:
+    """
+    处理器链的增量计算缓存
+
+    每个处理器阶段的输出按 (处理器名, 处理器代码版本, 参数, 输入内容哈希) 缓存在内存 LRU 中，
+    可选地写入磁盘目录作为第二级缓存；逐条处理的处理器（itemwise）在整体未命中时
+    复用单条的处理结果，只处理发生变化的条目。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.disk_dir = None
+        self.max_disk_entries = 1024
+        self._stages = _LRU(256)
+        self._items = _LRU(4096)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self.reset_stats()
+
+    def configure(self, settings: Dict[str, Any]):
+        """
+        根据配置启用缓存
+
+        Args:
+            settings: 缓存配置，包括 enabled、max_entries、max_item_entries、disk_dir、max_disk_entries
+        """
+        with self._lock:
+            self.enabled = settings.get('enabled', False)
+            self._stages = _LRU(settings.get('max_entries', 256))
+            self._items = _LRU(settings.get('max_item_entries', 4096))
+            self.disk_dir = settings.get('disk_dir') or None
+            self.max_disk_entries = settings.get('max_disk_entries', 1024)
+        if self.enabled:
+            logger.info(f"处理器链缓存已启用{'，磁盘目录: ' + self.disk_dir if self.disk_dir else ''}")
+
+    def reset_stats(self):
+        """清空命中统计"""
+        with self._lock:
+            self._counters = {
+                'stage_hits': 0, 'stage_misses': 0, 'disk_hits': 0,
+                'item_hits': 0, 'item_misses': 0,
+            }
+
+    def clear(self):
+        """清空内存缓存（不删除磁盘缓存）"""
+        with self._lock:
+            self._stages.clear()
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        with self._lock:
+            counters = dict(self._counters)
+            counters['stage_entries'] = len(self._stages)
+            counters['item_entries'] = len(self._items)
+        stage_total = counters['stage_hits'] + counters['stage_misses']
+        item_total = counters['item_hits'] + counters['item_misses']
+        counters['stage_hit_rate'] = counters['stage_hits'] / stage_total if stage_total else 0.0
+        counters['item_hit_rate'] = counters['item_hits'] / item_total if item_total else 0.0
+        return counters
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json.gz")
+
+    def _load_from_disk(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"读取处理器缓存 {path} 失败: {e}")
+            return None
+
+    def _save_to_disk(self, key: str, output: List[Dict[str, Any]]):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(output, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except Exception as e:
+            logger.error(f"写入处理器缓存 {path} 失败: {e}")
+
+    def _prune_disk(self):
+        """磁盘缓存超过上限时删除最早写入的文件"""
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            files.extend(os.path.join(root, name) for name in names if name.endswith('.json.gz'))
+        overflow = len(files) - self.max_disk_entries
+        if overflow > 0:
+            files.sort(key=os.path.getmtime)
+            for path in files[:overflow]:
+                os.remove(path)
+
+    def run(self, name: str, processor: BaseProcessor, content: List[Dict[str, Any]],
+            params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        执行一个处理器阶段，命中缓存时直接返回缓存的结果
+
+        Args:
+            name: 处理器名
+            processor: 处理器实例
+            content: 输入内容列表
+            params: 处理器参数
+
+        Returns:
+            List[Dict[str, Any]]: 处理后的内容列表
+        """
+        params_digest = _digest([_code_version(processor), params])
+        item_digests = [_digest(item) for item in content]
+        stage_key = _digest([name, params_digest, item_digests])
+
+        with self._lock:
+            output = self._stages.get(stage_key)
+        if output is None:
+            output = self._load_from_disk(stage_key)
+            if output is not None:
+                self._count('disk_hits')
+                with self._lock:
+                    self._stages.put(stage_key, output)
+        if output is not None:
+            self._count('stage_hits')
+            return list(output)
+        self._count('stage_misses')
+
+        if processor.itemwise:
+            output = []
+            hits = 0
+            for item, item_digest in zip(content, item_digests):
+                item_key = _digest([name, params_digest, item_digest])
+                with self._lock:
+                    result = self._items.get(item_key)
+                if result is None:
+                    result = processor.process_item(item, **params)
+                    with self._lock:
+                        self._items.put(item_key, result)
+                else:
+                    hits += 1
+                output.extend(result)
+            self._count('item_hits', hits)
+            self._count('item_misses', len(content) - hits)
+        else:
+            output = processor.process(content, **params)
+
+        with self._lock:
+            self._stages.put(stage_key, output)
+        self._save_to_disk(stage_key, output)
+        return list(output)
+
+
+# 创建全局处理器缓存实例
+processor_cache = ProcessorCache()
@@ -1,9 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 class BaseProcessor(ABC):
     """后处理器基类"""
     
+    # 逐条处理：每条输入的结果只取决于该条本身，输出按输入顺序拼接
+    # 为 True 时处理器链缓存可以复用单条的处理结果
+    itemwise = False
+    
+    # 处理器版本，参与处理器链缓存的键；修改了处理器依赖的其他模块（源码哈希覆盖不到）时应提升
+    version = '1'
+    
+    # 指向持久化状态文件的参数名 -> 未配置时的默认路径（None 表示不配置就不持久化）
+    # 回放时这些参数会被重定向到临时目录，避免读写线上状态
+    state_params: Dict[str, Any] = {}
+    
     @abstractmethod
     def process(self, content: str, **kwargs) -> str:
         """
@@ -17,4 +28,28 @@ class BaseProcessor(ABC):
             str: 处理后的内容
         """
         return content
-
+    
+    def process_item(self, item: Dict[str, Any], **kwargs) -> List[Dict[str, Any]]:
+        """
+        处理单条内容，仅在 itemwise 为 True 时使用
+        
+        Args:
+            item: 要处理的内容条目
+            **kwargs: 其他参数
+            
+        Returns:
+            List[Dict[str, Any]]: 该条目处理后的结果（过滤掉时为空列表）
+        """
+        return self.process([item], **kwargs)
+    
+    def is_cacheable(self, **kwargs) -> bool:
+        """
+        在给定参数下，处理结果是否只取决于输入内容（可以被缓存）
+        
+        Args:
+            **kwargs: 处理参数
+            
+        Returns:
+            bool: 是否可以缓存
+        """
+        return True
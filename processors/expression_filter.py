@@ -0,0 +1,318 @@
+import operator
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from .base import BaseProcessor
+
+# 词法单元：带引号的字符串、括号、比较运算符、普通单词
+_TOKEN_PATTERN = re.compile(r'''\s*(?:("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(\(|\))|(==|!=|>=|<=|>|<|~)|([^\s()"'=!<>~]+))''')
+# 千分位写法（1,234.5）或普通小数（3.12），单位后面紧跟字母时不视为单位（如 "3 models"）
+_NUMBER_PATTERN = re.compile(r'(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*(?:([kKmM](?![A-Za-z])|万))?')
+_NUMBER_SUFFIXES = {'': 1, 'k': 1000, 'K': 1000, 'm': 1000000, 'M': 1000000, '万': 10000}
+_NUMERIC_OPS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+# 各类子句的 (估计代价, 估计通过率)，用于决定 and/or 中子句的求值顺序
+_CLAUSE_PROFILE = {
+    '==': (1.0, 0.1),
+    '!=': (1.0, 0.9),
+    'numeric': (2.0, 0.5),
+    'contains': (3.0, 0.3),
+    '~': (5.0, 0.3),
+}
+
+# 特殊字段：拼接条目中的所有字符串字段
+ANY_FIELD = 'any'
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """
+    从字段值中解析数字，支持 "1,234"、"1.2k"、"56 stars today" 等格式
+
+    Args:
+        value: 字段值
+
+    Returns:
+        Optional[float]: 解析出的数字，无法解析时返回 None
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _NUMBER_PATTERN.search(value)
+    if not match:
+        return None
+    digits, suffix = match.groups()
+    return float(digits.replace(',', '')) * _NUMBER_SUFFIXES[suffix or '']
+
+
+class _ItemView:
+    """单个条目的字段访问包装，缓存字段文本和解析后的数字，避免多个子句重复计算"""
+
+    __slots__ = ('item', 'case_sensitive', '_text', '_numbers')
+
+    def __init__(self, item: Dict[str, Any], case_sensitive: bool):
+        self.item = item
+        self.case_sensitive = case_sensitive
+        self._text = {}
+        self._numbers = {}
+
+    def text(self, field: str) -> str:
+        text = self._text.get(field)
+        if text is None:
+            if field == ANY_FIELD:
+                text = '\n'.join(v for v in self.item.values() if isinstance(v, str))
+            else:
+                value = self.item.get(field)
+                text = '' if value is None else str(value)
+            if not self.case_sensitive:
+                text = text.lower()
+            self._text[field] = text
+        return text
+
+    def number(self, field: str) -> Optional[float]:
+        if field not in self._numbers:
+            self._numbers[field] = parse_number(self.item.get(field))
+        return self._numbers[field]
+
+
+class _Parser:
+    """
+    过滤表达式的递归下降解析器，语法：
+
+        expr       := and_expr ('or' and_expr)*
+        and_expr   := not_expr ('and' not_expr)*
+        not_expr   := 'not' not_expr | '(' expr ')' | comparison
+        comparison := FIELD ('contains' | '~' | '==' | '!=' | '>' | '>=' | '<' | '<=') VALUE
+
+    关键字不区分大小写，VALUE 可以是带引号的字符串或不含空白的单词
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = self._tokenize(expression)
+        self.pos = 0
+
+    @staticmethod
+    def _tokenize(expression: str) -> List[Tuple[str, str]]:
+        tokens = []
+        pos = 0
+        expression = expression.rstrip()
+        while pos < len(expression):
+            match = _TOKEN_PATTERN.match(expression, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"过滤表达式第 {pos} 个字符处无法识别: {expression[pos:pos + 10]!r}")
+            string, paren, op, word = match.groups()
+            if string is not None:
+                # 只还原转义的引号和反斜杠，保留正则中的 \d、\b 等写法
+                tokens.append(('string', re.sub(r'\\(["\'\\])', r'\1', string[1:-1])))
+            elif paren is not None:
+                tokens.append((paren, paren))
+            elif op is not None:
+                tokens.append(('op', op))
+            else:
+                lowered = word.lower()
+                if lowered in ('and', 'or', 'not'):
+                    tokens.append((lowered, word))
+                elif lowered == 'contains':
+                    tokens.append(('op', 'contains'))
+                else:
+                    tokens.append(('word', word))
+            pos = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def _next(self, expected: str) -> str:
+        kind = self._peek()
+        if kind != expected:
+            found = self.tokens[self.pos][1] if kind else '表达式结尾'
+            raise ValueError(f"过滤表达式语法错误: 期望 {expected}，实际为 {found!r}（{self.expression}）")
+        value = self.tokens[self.pos][1]
+        self.pos += 1
+        return value
+
+    def parse(self) -> tuple:
+        node = self._parse_or()
+        if self._peek() is not None:
+            raise ValueError(f"过滤表达式语法错误: 多余的 {self.tokens[self.pos][1]!r}（{self.expression}）")
+        return node
+
+    def _parse_or(self) -> tuple:
+        children = [self._parse_and()]
+        while self._peek() == 'or':
+            self.pos += 1
+            children.append(self._parse_and())
+        return children[0] if len(children) == 1 else ('or', children)
+
+    def _parse_and(self) -> tuple:
+        children = [self._parse_not()]
+        while self._peek() == 'and':
+            self.pos += 1
+            children.append(self._parse_not())
+        return children[0] if len(children) == 1 else ('and', children)
+
+    def _parse_not(self) -> tuple:
+        kind = self._peek()
+        if kind == 'not':
+            self.pos += 1
+            return ('not', self._parse_not())
+        if kind == '(':
+            self.pos += 1
+            node = self._parse_or()
+            self._next(')')
+            return node
+        field = self._next('word')
+        op = self._next('op')
+        value = self._next('string') if self._peek() == 'string' else self._next('word')
+        return ('cmp', field, op, value)
+
+
+def _flatten(node: tuple) -> tuple:
+    """将嵌套的同类 and/or 节点展开为一层"""
+    kind = node[0]
+    if kind in ('and', 'or'):
+        children = []
+        for child in map(_flatten, node[1]):
+            children.extend(child[1] if child[0] == kind else [child])
+        return (kind, children)
+    if kind == 'not':
+        return ('not', _flatten(node[1]))
+    return node
+
+
+def _compile_node(node: tuple, case_sensitive: bool) -> Tuple[Callable[[_ItemView], bool], float, float]:
+    """
+    将语法树节点编译为谓词函数
+
+    Returns:
+        (谓词, 估计代价, 估计通过率)
+    """
+    kind = node[0]
+
+    if kind == 'not':
+        inner, cost, selectivity = _compile_node(node[1], case_sensitive)
+        return (lambda view: not inner(view)), cost, 1.0 - selectivity
+
+    if kind in ('and', 'or'):
+        compiled = [_compile_node(child, case_sensitive) for child in node[1]]
+        if kind == 'and':
+            # 代价低且容易被否决的子句先求值
+            compiled.sort(key=lambda c: c[1] / max(1.0 - c[2], 1e-6))
+            predicates = tuple(c[0] for c in compiled)
+
+            def predicate(view):
+                for p in predicates:
+                    if not p(view):
+                        return False
+                return True
+
+            selectivity = 1.0
+            for c in compiled:
+                selectivity *= c[2]
+        else:
+            # 代价低且容易通过的子句先求值
+            compiled.sort(key=lambda c: c[1] / max(c[2], 1e-6))
+            predicates = tuple(c[0] for c in compiled)
+
+            def predicate(view):
+                for p in predicates:
+                    if p(view):
+                        return True
+                return False
+
+            rejected = 1.0
+            for c in compiled:
+                rejected *= 1.0 - c[2]
+            selectivity = 1.0 - rejected
+        return predicate, sum(c[1] for c in compiled), selectivity
+
+    _, field, op, value = node
+
+    if op in _NUMERIC_OPS:
+        target = parse_number(value)
+        if target is None:
+            raise ValueError(f"过滤表达式中 {field} {op} 的比较值不是数字: {value!r}")
+        compare = _NUMERIC_OPS[op]
+
+        def predicate(view):
+            number = view.number(field)
+            return number is not None and compare(number, target)
+
+        return (predicate, *_CLAUSE_PROFILE['numeric'])
+
+    if op == '~':
+        try:
+            pattern = re.compile(value, 0 if case_sensitive else re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"过滤表达式中的正则无效: {value!r}（{e}）") from e
+        return (lambda view: pattern.search(view.text(field)) is not None), *_CLAUSE_PROFILE['~']
+
+    needle = value if case_sensitive else value.lower()
+    if op == 'contains':
+        return (lambda view: needle in view.text(field)), *_CLAUSE_PROFILE['contains']
+
+    needle = needle.strip()
+    if op == '==':
+        return (lambda view: view.text(field).strip() == needle), *_CLAUSE_PROFILE['==']
+    return (lambda view: view.text(field).strip() != needle), *_CLAUSE_PROFILE['!=']
+
+
+@lru_cache(maxsize=128)
+def compile_expression(expression: str, case_sensitive: bool = False) -> Callable[[Dict[str, Any]], bool]:
+    """
+    将过滤表达式编译为谓词函数，结果按表达式文本缓存
+
+    Args:
+        expression: 过滤表达式，如 (title contains AI or content contains LLM) and not content contains crypto
+        case_sensitive: 是否区分大小写
+
+    Returns:
+        Callable[[Dict[str, Any]], bool]: 接收条目、返回是否保留的谓词
+    """
+    tree = _flatten(_Parser(expression).parse())
+    predicate, _, _ = _compile_node(tree, case_sensitive)
+    return lambda item: predicate(_ItemView(item, case_sensitive))
+
+
+class ExpressionFilterProcessor(BaseProcessor):
+    """布尔表达式过滤处理器"""
+
+    itemwise = True
+
+    def process(self, content: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+        """
+        根据布尔过滤表达式过滤内容
+
+        Args:
+            content: 要处理的内容列表，每个元素是一个字典
+            **kwargs: 其他参数，包括：
+                - expression: 过滤表达式，支持 and/or/not、括号，以及以下比较：
+                    field contains "文本"   包含子串
+                    field ~ "正则"          正则匹配
+                    field == 值 / field != 值
+                    field > 数字（>=、<、<= 同理），字段值中的 "1,234"、"1.2k" 会被解析为数字
+                  字段名 any 表示所有字符串字段
+                - case_sensitive: 是否区分大小写（默认为False）
+
+        字段取自信息源产出的条目，条目中没有的字段按空字符串处理，数字比较视为不满足。
+        例如 github_trending 把当天所有仓库汇总为一条，只有 title、source、content 三个字段，
+        对它使用 language、stars 等字段会把整条汇总过滤掉。
+
+        Returns:
+            List[Dict[str, Any]]: 过滤后的内容列表
+        """
+        if not content:
+            return []
+
+        expression = kwargs.get('expression', '').strip()
+        if not expression:
+            return content
+
+        predicate = compile_expression(expression, kwargs.get('case_sensitive', False))
+        return [item for item in content if predicate(item)]
+
+
+# 创建同名处理器实例
+expression_filter_processor = ExpressionFilterProcessor()
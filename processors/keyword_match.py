@@ -4,6 +4,8 @@ from .base import BaseProcessor
 class KeywordMatchProcessor(BaseProcessor):
     """关键词匹配处理器"""
     
+    itemwise = True
+    
     def process(self, content: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
         """
         根据关键词过滤内容
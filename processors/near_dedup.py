@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from logger import logger
+from .base import BaseProcessor
+from .text import tokenize, item_text
+
+_NUM_PERM = 128
+_BAND_ROWS = 4
+
+# 固定种子生成的 multiply-shift 哈希族参数，保证签名在多次运行间可比较
+_rng = np.random.RandomState(20240601)
+_PERM_A = (_rng.randint(0, 2 ** 32, size=_NUM_PERM, dtype=np.uint64) << np.uint64(32)) \
+    | _rng.randint(0, 2 ** 32, size=_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = (_rng.randint(0, 2 ** 32, size=_NUM_PERM, dtype=np.uint64) << np.uint64(32)) \
+    | _rng.randint(0, 2 ** 32, size=_NUM_PERM, dtype=np.uint64)
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """
+    计算文本词元集合的 MinHash 签名
+
+    Args:
+        text: 要计算签名的文本
+
+    Returns:
+        Optional[np.ndarray]: 长度为 128 的签名，文本中没有任何词元时返回 None
+    """
+    features = set(tokenize(text))
+    if not features:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'little') for f in features),
+        dtype=np.uint64, count=len(features)
+    )
+    # uint64 乘法按 2^64 取模回绕，取高 32 位作为哈希值
+    return ((hashes[:, None] * _PERM_A + _PERM_B) >> np.uint64(32)).min(axis=0)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """由两个 MinHash 签名估计 Jaccard 相似度"""
+    return float(np.count_nonzero(a == b)) / _NUM_PERM
+
+
+def _band_keys(signature: np.ndarray):
+    """将签名按每 4 个值切分成段，作为局部敏感哈希的桶键"""
+    for start in range(0, _NUM_PERM, _BAND_ROWS):
+        yield start, signature[start:start + _BAND_ROWS].tobytes()
+
+
+class NearDedupProcessor(BaseProcessor):
+    """近似去重处理器，使用 MinHash + 局部敏感哈希将相似条目合并为一条"""
+
+    state_params = {'state_file': None}
+
+    def is_cacheable(self, **kwargs) -> bool:
+        # 启用历史签名时，相同输入的结果取决于之前推送过的内容
+        return not kwargs.get('state_file')
+
+    def _load_memory(self, path: str, max_age: float) -> List[Dict[str, Any]]:
+        """加载历史签名，并丢弃过期的签名"""
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            logger.error(f"加载去重签名 {path} 失败: {e}")
+            return []
+        deadline = time.time() - max_age
+        memory = []
+        for entry in entries:
+            if entry.get('time', 0) >= deadline:
+                entry['signature'] = np.frombuffer(bytes.fromhex(entry['signature']), dtype='<u4').astype(np.uint64)
+                memory.append(entry)
+        return memory
+
+    def _save_memory(self, path: str, memory: List[Dict[str, Any]]):
+        """保存历史签名（先写临时文件再替换）"""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump([
+                    dict(entry, signature=entry['signature'].astype('<u4').tobytes().hex()) for entry in memory
+                ], f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"保存去重签名 {path} 失败: {e}")
+
+    def process(self, content: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+        """
+        合并标题和内容近似重复的条目，每组只保留第一条，并附上其他来源的链接
+
+        Args:
+            content: 要处理的内容列表，每个元素是一个字典
+            **kwargs: 其他参数，包括：
+                - fields: 参与计算签名的字段（默认为 title 和 content）
+                - threshold: 判定为重复的最低 Jaccard 相似度估计值（默认为0.5）
+                - state_file: 历史签名文件路径，设置后会跨运行丢弃已推送过的相似条目（默认不启用）
+                - memory_hours: 历史签名保留时长，单位小时（默认为72）
+
+        Returns:
+            List[Dict[str, Any]]: 去重后的内容列表，被合并的条目记录在 also_reported_by 字段中
+        """
+        if not content:
+            return []
+
+        fields = kwargs.get('fields', ['title', 'content'])
+        threshold = kwargs.get('threshold', 0.5)
+        state_file = kwargs.get('state_file')
+        max_age = kwargs.get('memory_hours', 72) * 3600
+
+        signatures = [minhash(item_text(item, fields)) for item in content]
+
+        memory = self._load_memory(state_file, max_age) if state_file else []
+        memory_buckets = defaultdict(list)
+        for entry in memory:
+            for key in _band_keys(entry['signature']):
+                memory_buckets[key].append(entry['signature'])
+
+        # 并查集：只比较落入同一个桶中的候选对，避免两两比较
+        parent = list(range(len(content)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        buckets = defaultdict(list)
+        seen_before = set()
+        for i, sig in enumerate(signatures):
+            if sig is None:
+                # 没有任何词元的条目（如只有链接）无法判断相似度，单独成组
+                continue
+            for key in _band_keys(sig):
+                if i not in seen_before and any(similarity(sig, old) >= threshold for old in memory_buckets.get(key, ())):
+                    seen_before.add(i)
+                for j in buckets[key]:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j and similarity(sig, signatures[j]) >= threshold:
+                        # 保证代表条目始终是输入顺序中最靠前的
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+                buckets[key].append(i)
+
+        clusters = defaultdict(list)
+        for i in range(len(content)):
+            clusters[find(i)].append(i)
+
+        result = []
+        now = time.time()
+        for root, members in clusters.items():
+            if any(i in seen_before for i in members):
+                continue
+            representative = dict(content[root])
+            others = [content[i] for i in members[1:]]
+            if others:
+                representative['also_reported_by'] = [
+                    {k: other[k] for k in ('source', 'title', 'url') if k in other} for other in others
+                ]
+                links = [
+                    f"[{other.get('source', '未知来源')}]({other['url']})" if 'url' in other else other.get('source', '未知来源')
+                    for other in others
+                ]
+                representative['content'] = f"{representative.get('content', '')}\n\n也见于: {', '.join(links)}"
+            result.append(representative)
+            if state_file and signatures[root] is not None:
+                memory.append({
+                    'signature': signatures[root],
+                    'title': representative.get('title', ''),
+                    'source': representative.get('source', ''),
+                    'time': now,
+                })
+
+        if state_file:
+            self._save_memory(state_file, memory)
+
+        logger.debug(
+            f"近似去重: {len(content)} 条合并为 {len(clusters)} 组，其中 {len(clusters) - len(result)} 组在历史中已出现"
+        )
+        return result
+
+
+# 创建同名处理器实例
+near_dedup_processor = NearDedupProcessor()
@@ -0,0 +1,38 @@
+import re
+from typing import Any, Dict, Iterable, List
+
+# 英文/数字按单词切分，中日韩文字按单字切分
+_TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9_+#.\-]*[a-z0-9+#]|[a-z0-9]|[一-鿿぀-ヿ가-힯]')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为小写词元
+
+    Args:
+        text: 要切分的文本
+
+    Returns:
+        List[str]: 词元列表
+    """
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def item_text(item: Dict[str, Any], fields: Iterable[str] = None) -> str:
+    """
+    拼接条目中的文本字段
+
+    Args:
+        item: 内容条目
+        fields: 要拼接的字段名，为空时使用所有字符串字段
+
+    Returns:
+        str: 拼接后的文本
+    """
+    if fields:
+        values = [item.get(f) for f in fields]
+    else:
+        values = item.values()
+    return '\n'.join(v for v in values if isinstance(v, str))
@@ -2,6 +2,10 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict, List
 import sys
 
+import requests
+
+from cassette import cassette
+
 class BaseSource(ABC):
     """信息源基类"""
     
@@ -11,3 +15,16 @@ class BaseSource(ABC):
         获取数据并格式化为消息
         """
         pass
+    
+    def _http_get(self, url: str, **kwargs) -> requests.Response:
+        """
+        发送 GET 请求，所有信息源都应通过该方法访问网络，以支持录制/回放
+        
+        Args:
+            url: 请求地址
+            **kwargs: 传给 requests 的其他参数
+        
+        Returns:
+            requests.Response: 响应对象
+        """
+        return cassette.request('GET', url, **kwargs)
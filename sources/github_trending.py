@@ -47,7 +47,7 @@ class GitHubTrendingSource(BaseSource):
         }
         
         try:
-            response = requests.get(url, headers=headers)
+            response = self._http_get(url, headers=headers)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.text, 'html.parser')
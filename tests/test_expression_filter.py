@@ -0,0 +1,94 @@
+import pytest
+
+from processors.expression_filter import compile_expression, expression_filter_processor, parse_number
+
+
+@pytest.mark.parametrize('value, expected', [
+    (42, 42.0),
+    (1.5, 1.5),
+    ('1,234', 1234.0),
+    ('1,234,567.8', 1234567.8),
+    ('1.2k', 1200.0),
+    ('3M stars', 3000000.0),
+    ('2万', 20000.0),
+    ('56 stars today', 56.0),
+    ('Python 3.12.1 released', 3.12),
+    ('12,34', 12.0),
+    ('3 models', 3.0),
+    ('no digits', None),
+    (None, None),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+
+ITEMS = [
+    {'title': 'New LLM released', 'source': 'news', 'stars': '1.2k', 'language': 'Rust'},
+    {'title': 'AI crypto coin', 'source': 'news', 'stars': '300', 'language': 'Go'},
+    {'title': 'Python 3.12.1 released', 'source': 'blog', 'version': '3.12.1'},
+    {'title': 'Daily Github Trending', 'source': 'github_trending', 'content': 'AI agents, 56 stars today'},
+]
+
+
+def _titles(expression, items=ITEMS, **kwargs):
+    return [item['title'] for item in items if compile_expression(expression, **kwargs)(item)]
+
+
+def test_and_binds_tighter_than_or():
+    assert _titles('title contains crypto or title contains llm and language == Go') == ['AI crypto coin']
+    assert _titles('(title contains crypto or title contains llm) and language == Go') == ['AI crypto coin']
+
+
+def test_not_and_parentheses():
+    assert _titles('(title contains "ai " or title contains llm) and not title contains crypto') == ['New LLM released']
+    assert _titles('not (source == news or source == blog)') == ['Daily Github Trending']
+
+
+def test_numeric_comparison():
+    assert _titles('stars >= 1k') == ['New LLM released']
+    assert _titles('stars < 1,000') == ['AI crypto coin']
+    # 版本号之类含多个小数点的值不应导致异常
+    assert _titles('version > 3') == ['Python 3.12.1 released']
+
+
+def test_missing_field_is_empty():
+    assert _titles('language != Rust') == ['AI crypto coin', 'Python 3.12.1 released', 'Daily Github Trending']
+    assert _titles('language == Rust or stars > 0') == ['New LLM released', 'AI crypto coin']
+
+
+def test_regex_and_case_sensitivity():
+    assert _titles(r'title ~ "\d+\.\d+"') == ['Python 3.12.1 released']
+    assert _titles('title contains llm', case_sensitive=True) == []
+    assert _titles('title contains LLM', case_sensitive=True) == ['New LLM released']
+
+
+def test_quoted_values():
+    assert _titles('title == "Daily Github Trending"') == ['Daily Github Trending']
+    assert _titles(r'title contains "crypto \"coin"') == []
+
+
+@pytest.mark.parametrize('expression', [
+    'title contains',
+    '(title contains AI',
+    'title contains AI)',
+    'title contains AI and',
+    'title AI',
+    'stars > many',
+    'title contains AI &&',
+    'title ~ "(unclosed"',
+])
+def test_syntax_errors(expression):
+    with pytest.raises(ValueError):
+        compile_expression(expression)
+
+
+def test_compiled_expression_is_cached():
+    assert compile_expression('title contains ai') is compile_expression('title contains ai')
+    assert compile_expression('title contains ai') is not compile_expression('title contains ai', True)
+
+
+def test_processor():
+    expression = 'source == github_trending and (content contains AI or content contains LLM) and not content contains crypto'
+    assert expression_filter_processor.process(ITEMS, expression=expression) == [ITEMS[3]]
+    assert expression_filter_processor.process(ITEMS, expression='  ') == ITEMS
+    assert expression_filter_processor.process([], expression='title contains ai') == []